@@ -9,19 +9,28 @@ Author: AI Assistant
 Date: August 2025
 """
 
-import json
+import base64
+import contextlib
+import hashlib
 import logging
 import os
+import queue
+import re
 import signal
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Generator, Any
+from typing import Dict, List, Optional, Tuple, Generator, Any, Union, Callable
 
 import numpy as np
+import orjson
 import torch
 from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
-from transformers import AutoModel, AutoTokenizer, DistilBertModel, DistilBertTokenizer
+from transformers import AutoModel, AutoTokenizer, DistilBertModel, PreTrainedTokenizerFast
 
 # Configure logging
 logging.basicConfig(
@@ -33,42 +42,410 @@ logger = logging.getLogger(__name__)
 # Configuration
 MODEL_NAME = "distilbert-base-uncased"
 MAX_TEXT_LENGTH = 1000
+DEMO_MAX_TOKENS = 256  # attention cost grows with seq_len², so cap long inputs
+TRACE_MAX_LENGTH = 128
+INFERENCE_BACKEND = os.environ.get("ATTENTION_BACKEND", "torchscript")  # "torchscript", "onnx" or "eager"
+ONNX_MODEL_PATH = Path(__file__).resolve().parent / "distilbert.onnx"
+ONNX_OPSET = 14
+MAX_RELATIONSHIPS = 20
+ATTENTION_CACHE_SIZE = 128
+MAX_BATCH_SIZE = 8
+MAX_BATCH_WAIT_SECONDS = 0.01
+LAYER_ATTENTION_MODULE = re.compile(r'(?:^|\.)transformer\.layer\.(\d+)\.attention$')
+QUANTIZE_MODEL = True  # int8 dynamic quantization of Linear layers (TorchScript backend)
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+USE_IPEX = os.environ.get("ATTENTION_IPEX", "0") == "1"  # bf16 + oneDNN fusion via Intel Extension for PyTorch
 PORT = 8080
 HOST = "localhost"
 
-# Global model and tokenizer (cached)
-model: Optional[DistilBertModel] = None
-tokenizer: Optional[DistilBertTokenizer] = None
+# Global model, tokenizer and extractor (cached)
+model: Optional[Union[torch.jit.ScriptModule, "OnnxAttentionModel", "AttentionOnlyModel", "MicroBatcher"]] = None
+tokenizer: Optional[PreTrainedTokenizerFast] = None
+extractor: Optional["AttentionExtractor"] = None
+_init_lock = threading.Lock()
 
 app = Flask(__name__)
 CORS(app, origins=[f"http://{HOST}:{PORT}"])
 
 
+class AttentionCache:
+    """Thread-safe LRU cache of SSE frames keyed by a hash of the input text."""
+    
+    def __init__(self, maxsize: int):
+        """Initialize an empty cache.
+        
+        Args:
+            maxsize: Maximum number of texts to keep
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(text: str, include_layers: bool) -> str:
+        """Hash the input text and response options into a cache key."""
+        return hashlib.sha256(f"{int(include_layers)}:{text}".encode('utf-8')).hexdigest()
+    
+    def get(self, text: str, include_layers: bool = False) -> Optional[List[bytes]]:
+        """Return cached frames for the text, marking them as recently used.
+        
+        Args:
+            text: Input text
+            include_layers: Whether the frames include per-layer matrices
+            
+        Returns:
+            Cached SSE frames, or None on a miss
+        """
+        key = self._key(text, include_layers)
+        with self._lock:
+            frames = self._entries.get(key)
+            if frames is not None:
+                self._entries.move_to_end(key)
+            return frames
+    
+    def put(self, text: str, frames: List[bytes], include_layers: bool = False) -> None:
+        """Store frames for the text, evicting the least recently used entry if full.
+        
+        Args:
+            text: Input text
+            frames: Complete list of SSE frames produced for the text
+            include_layers: Whether the frames include per-layer matrices
+        """
+        key = self._key(text, include_layers)
+        with self._lock:
+            self._entries[key] = frames
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Processed attention for recently submitted texts
+attention_cache = AttentionCache(ATTENTION_CACHE_SIZE)
+
+
+# Scratch buffers for meaningful attention, shared by all request threads.
+# The development server starts a new thread per request, so buffers are
+# pooled rather than thread-local; the pool holds at most one per
+# concurrent request.
+_workspace_pool: List[torch.Tensor] = []
+_workspace_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def meaningful_buffer(num_tokens: int) -> Generator[torch.Tensor, None, None]:
+    """Borrow a float32 (num_tokens, num_tokens) buffer from the shared pool.
+    
+    A pooled buffer is replaced by one of exactly num_tokens² elements if it
+    is too small. The buffer returns to the pool on exit, so callers must
+    copy what they keep.
+    
+    Args:
+        num_tokens: Sequence length
+        
+    Yields:
+        Contiguous view into the borrowed buffer
+    """
+    size = num_tokens * num_tokens
+    with _workspace_lock:
+        buffer = _workspace_pool.pop() if _workspace_pool else None
+    if buffer is None or buffer.numel() < size:
+        buffer = torch.empty(size, dtype=torch.float32)
+    try:
+        yield buffer[:size].view(num_tokens, num_tokens)
+    finally:
+        with _workspace_lock:
+            _workspace_pool.append(buffer)
+
+
+def sse_frame(event: Dict[str, Any]) -> bytes:
+    """Serialize an event as a Server-Sent Events frame.
+    
+    Args:
+        event: JSON-serializable event payload (numpy arrays allowed)
+        
+    Returns:
+        SSE-formatted bytes
+    """
+    return b"data: " + orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n\n"
+
+
+def pack_matrix(matrix: np.ndarray) -> Dict[str, Any]:
+    """Encode an attention matrix as base64 little-endian float16 bytes.
+    
+    Softmax outputs lie in [0, 1], so float16 loses no visible precision
+    while being far cheaper to serialize than nested JSON lists.
+    
+    Args:
+        matrix: 2D attention matrix
+        
+    Returns:
+        Dictionary with the encoded matrix and its shape
+    """
+    return {
+        'attention_matrix': base64.b64encode(matrix.astype('<f2').tobytes()).decode('ascii'),
+        'shape': matrix.shape
+    }
+
+
+class AttentionOnlyModel(torch.nn.Module):
+    """Wrap DistilBERT so its forward pass returns only the attention tensors.
+
+    TorchScript cannot trace the ``ModelOutput`` dictionaries returned by
+    Hugging Face models, so this wrapper exposes a plain tuple instead.
+    """
+
+    def __init__(self, model: DistilBertModel):
+        """Initialize with a loaded DistilBERT model.
+
+        Args:
+            model: DistilBERT model loaded with eager attention
+        """
+        super().__init__()
+        self.model = model
+
+    def forward(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor
+    ) -> Tuple[torch.Tensor, ...]:
+        """Run the model and return the per-layer attention tensors.
+
+        Args:
+            input_ids: Token ids of shape (batch_size, seq_len)
+            attention_mask: Attention mask of shape (batch_size, seq_len)
+
+        Returns:
+            Tuple with one (batch_size, num_heads, seq_len, seq_len) tensor per layer
+        """
+        outputs = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            output_attentions=True,
+            return_dict=False
+        )
+        return outputs[-1]
+
+
+class OnnxAttentionModel:
+    """Run the exported DistilBERT attention graph through ONNX Runtime.
+
+    Mirrors the call signature of the TorchScript module so that
+    AttentionExtractor can use either backend interchangeably.
+    """
+
+    def __init__(self, session: Any):
+        """Initialize with an ONNX Runtime inference session.
+
+        Args:
+            session: ``onnxruntime.InferenceSession`` for the exported model
+        """
+        self.session = session
+
+    def eval(self) -> "OnnxAttentionModel":
+        """No-op kept for parity with ``torch.nn.Module.eval``."""
+        return self
+
+    def __call__(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor
+    ) -> Tuple[torch.Tensor, ...]:
+        """Run the session and return the per-layer attention tensors.
+
+        Args:
+            input_ids: Token ids of shape (batch_size, seq_len)
+            attention_mask: Attention mask of shape (batch_size, seq_len)
+
+        Returns:
+            Tuple with one (batch_size, num_heads, seq_len, seq_len) tensor per layer
+        """
+        outputs = self.session.run(None, {
+            'input_ids': input_ids.numpy(),
+            'attention_mask': attention_mask.numpy()
+        })
+        return tuple(torch.from_numpy(output) for output in outputs)
+
+
+class MicroBatcher:
+    """Group concurrent forward passes into a single padded batch.
+    
+    Callers block until their slice of the batched result is ready. A
+    background thread collects up to ``max_batch_size`` requests, waiting
+    at most ``max_wait`` seconds after the first, and runs one forward pass.
+    """
+    
+    def __init__(
+        self, 
+        model: Union[torch.jit.ScriptModule, OnnxAttentionModel], 
+        pad_token_id: int = 0,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait: float = MAX_BATCH_WAIT_SECONDS
+    ):
+        """Initialize and start the batching thread.
+        
+        Args:
+            model: Compiled DistilBERT attention model
+            pad_token_id: Token id used to right-pad shorter sequences
+            max_batch_size: Maximum number of requests per forward pass
+            max_wait: Seconds to wait for more requests after the first
+        """
+        self.model = model
+        self.pad_token_id = pad_token_id
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._requests: queue.Queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def eval(self) -> "MicroBatcher":
+        """Put the wrapped model in eval mode."""
+        self.model.eval()
+        return self
+    
+    def __call__(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor
+    ) -> Tuple[torch.Tensor, ...]:
+        """Queue a single sequence and wait for its attention tensors.
+        
+        Args:
+            input_ids: Token ids of shape (1, seq_len)
+            attention_mask: Attention mask of shape (1, seq_len)
+            
+        Returns:
+            Tuple with one (1, num_heads, seq_len, seq_len) tensor per layer
+        """
+        future: Future = Future()
+        self._requests.put((input_ids, attention_mask, future))
+        return future.result()
+    
+    def _run(self) -> None:
+        """Collect requests into batches and process them forever."""
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            # A failure anywhere in the batch must reach every waiting caller
+            # and leave this thread alive for the next batch
+            try:
+                self._process(batch)
+            except Exception as e:
+                logger.error(f"Batched forward pass failed: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def _process(self, batch: List[Tuple[torch.Tensor, torch.Tensor, Future]]) -> None:
+        """Run one padded forward pass and resolve each request with its slice.
+        
+        Args:
+            batch: Queued (input_ids, attention_mask, future) requests
+            
+        Raises:
+            Exception: Any padding, forward or slicing error, for _run to
+                deliver to the waiting callers
+        """
+        lengths = [input_ids.shape[1] for input_ids, _, _ in batch]
+        max_length = max(lengths)
+        
+        device = batch[0][0].device
+        input_ids = torch.full((len(batch), max_length), self.pad_token_id, dtype=torch.long, device=device)
+        attention_mask = torch.zeros((len(batch), max_length), dtype=torch.long, device=device)
+        for row, (ids, mask, _) in enumerate(batch):
+            input_ids[row, :lengths[row]] = ids[0]
+            attention_mask[row, :lengths[row]] = mask[0]
+        
+        with torch.inference_mode():
+            attention_weights = self.model(input_ids, attention_mask)
+        
+        # Padding is masked out, so each sequence's attention over its own
+        # tokens matches an unbatched forward pass. Slice every row before
+        # resolving any, so a malformed output fails the whole batch.
+        results = [
+            tuple(layer_attn[row:row + 1, :, :length, :length] for layer_attn in attention_weights)
+            for row, length in enumerate(lengths)
+        ]
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
 class AttentionExtractor:
     """Extract and process attention weights from DistilBERT model."""
     
-    def __init__(self, model: DistilBertModel, tokenizer: DistilBertTokenizer):
+    def __init__(
+        self, 
+        model: Union[torch.jit.ScriptModule, OnnxAttentionModel, AttentionOnlyModel, MicroBatcher], 
+        tokenizer: PreTrainedTokenizerFast,
+        device: torch.device = torch.device("cpu")
+    ):
         """Initialize with pre-loaded model and tokenizer.
         
         Args:
-            model: Pre-loaded DistilBERT model
-            tokenizer: Pre-loaded DistilBERT tokenizer
+            model: Pre-loaded DistilBERT attention model (TorchScript, ONNX or eager),
+                optionally wrapped in a MicroBatcher
+            tokenizer: Pre-loaded fast (Rust-backed) DistilBERT tokenizer
+            device: Device the model expects its inputs on
         """
         self.model = model
         self.tokenizer = tokenizer
+        self.device = device
         self.model.eval()
     
-    def extract_attention_weights(
+    def _register_layer_hooks(
         self, 
-        text: str
-    ) -> Dict[str, Any]:
-        """Extract attention weights from input text.
+        on_layer: Callable[[int, torch.Tensor], None]
+    ) -> List[torch.utils.hooks.RemovableHandle]:
+        """Report each layer's attention to a callback as soon as it is computed.
+        
+        Hooks only fire on eager ``nn.Module`` models; TorchScript and ONNX
+        graphs run as a single opaque call. The hooks ignore forward passes
+        from other threads, since the model is shared between requests.
+        
+        Args:
+            on_layer: Called with the layer index and its attention tensor
+            
+        Returns:
+            Handles for removing the registered hooks
+        """
+        if not isinstance(self.model, torch.nn.Module) or isinstance(self.model, torch.jit.ScriptModule):
+            return []
+        
+        owner = threading.get_ident()
+        
+        def make_hook(layer_idx: int):
+            def hook(module, inputs, outputs):
+                if threading.get_ident() == owner:
+                    on_layer(layer_idx, outputs[1])
+            return hook
+        
+        handles = []
+        for name, module in self.model.named_modules():
+            match = LAYER_ATTENTION_MODULE.search(name)
+            if match:
+                handles.append(module.register_forward_hook(make_hook(int(match.group(1)))))
+        return handles
+    
+    def _tokenize(self, text: str) -> Dict[str, torch.Tensor]:
+        """Validate and tokenize input text.
         
         Args:
             text: Input text to analyze (max 1000 characters)
             
         Returns:
-            Dictionary containing tokens and attention data
+            Tokenizer output with input ids and attention mask
             
         Raises:
             ValueError: If text exceeds character limit or is empty
@@ -79,27 +456,68 @@ class AttentionExtractor:
         if len(text) > MAX_TEXT_LENGTH:
             raise ValueError(f"Text exceeds maximum length of {MAX_TEXT_LENGTH} characters")
         
-        # Tokenize input
-        inputs = self.tokenizer(
+        # A single sequence never needs padding; MicroBatcher pads batches itself
+        return self.tokenizer(
             text, 
             return_tensors="pt", 
             truncation=True, 
-            max_length=512,
-            padding=True
+            max_length=DEMO_MAX_TOKENS
         )
+    
+    def _to_device(self, inputs: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """Move tokenized inputs to the model's device.
+        
+        GPU copies are staged through pinned host memory so they can run
+        asynchronously.
+        
+        Args:
+            inputs: Tokenizer output on the CPU
+            
+        Returns:
+            Input ids and attention mask on ``self.device``
+        """
+        if self.device.type != 'cuda':
+            return inputs
+        return {
+            key: inputs[key].pin_memory().to(self.device, non_blocking=True)
+            for key in ('input_ids', 'attention_mask')
+        }
+    
+    def extract_attention_weights(
+        self, 
+        text: str,
+        include_layers: bool = False
+    ) -> Dict[str, Any]:
+        """Extract attention weights from input text.
+        
+        Args:
+            text: Input text to analyze (max 1000 characters)
+            include_layers: Whether to include every layer's attention matrix
+                rather than just its shape
+            
+        Returns:
+            Dictionary containing tokens and attention data
+            
+        Raises:
+            ValueError: If text exceeds character limit or is empty
+        """
+        inputs = self._tokenize(text)
+        model_inputs = self._to_device(inputs)
         
         # Get model outputs with attention weights
-        with torch.no_grad():
-            outputs = self.model(**inputs, output_attentions=True)
+        with torch.inference_mode():
+            # Tuple of tensors for each layer
+            attention_weights = self.model(model_inputs['input_ids'], model_inputs['attention_mask'])
         
         # Extract tokens
         tokens = self.tokenizer.convert_ids_to_tokens(inputs['input_ids'][0])
         
-        # Process attention weights
-        attention_weights = outputs.attentions  # Tuple of tensors for each layer
-        
         # Convert to numpy and process
-        processed_attention = self._process_attention_weights(attention_weights, tokens)
+        processed_attention = self._process_attention_weights(
+            attention_weights, 
+            tokens, 
+            include_layers
+        )
         
         return {
             'tokens': tokens,
@@ -108,56 +526,173 @@ class AttentionExtractor:
             'num_heads': attention_weights[0].shape[1]
         }
     
+    def stream_attention_weights(
+        self, 
+        text: str,
+        include_layers: bool = False
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Extract attention weights, yielding each layer as soon as it is computed.
+        
+        The forward pass runs in a worker thread. With an eager model each
+        layer is yielded the moment its attention is produced; compiled
+        models yield all layers once the forward pass finishes.
+        
+        Args:
+            text: Input text to analyze (max 1000 characters)
+            include_layers: Whether to include every layer's attention matrix
+                rather than just its shape
+            
+        Yields:
+            Event dictionaries for tokens, each layer, meaningful attention
+            and relationships, in that order
+            
+        Raises:
+            ValueError: If text exceeds character limit or is empty
+        """
+        inputs = self._tokenize(text)
+        tokens = self.tokenizer.convert_ids_to_tokens(inputs['input_ids'][0])
+        yield {'type': 'tokens', 'data': tokens}
+        
+        model_inputs = self._to_device(inputs)
+        events: queue.Queue = queue.Queue()
+        
+        def run_forward():
+            handles = self._register_layer_hooks(
+                lambda layer_idx, attn: events.put(('layer', attn))
+            )
+            try:
+                with torch.inference_mode():
+                    attention_weights = self.model(model_inputs['input_ids'], model_inputs['attention_mask'])
+                events.put(('done', attention_weights))
+            except Exception as e:
+                events.put(('error', e))
+            finally:
+                for handle in handles:
+                    handle.remove()
+        
+        threading.Thread(target=run_forward, daemon=True).start()
+        
+        layer_averages = []
+        while True:
+            kind, payload = events.get()
+            if kind == 'error':
+                raise payload
+            
+            # Compiled models report every layer at once after the forward pass
+            pending = [payload] if kind == 'layer' else list(payload[len(layer_averages):])
+            for layer_attn in pending:
+                avg_attention = self._average_heads(layer_attn)
+                yield {
+                    'type': 'layer_attention',
+                    'layer': len(layer_averages),
+                    'data': self._layer_payload(len(layer_averages), avg_attention, include_layers)
+                }
+                layer_averages.append(avg_attention)
+            
+            if kind == 'done':
+                break
+        
+        aggregated = self._aggregate_attention(layer_averages, tokens)
+        yield {'type': 'meaningful_attention', 'data': aggregated['meaningful_attention']}
+        yield {'type': 'relationships', 'data': aggregated['relationships']}
+    
     def _process_attention_weights(
         self, 
         attention_weights: Tuple[torch.Tensor, ...], 
-        tokens: List[str]
+        tokens: List[str],
+        include_layers: bool = False
     ) -> Dict[str, Any]:
         """Process raw attention weights into visualization-ready format.
         
         Args:
             attention_weights: Tuple of attention tensors from each layer
             tokens: List of tokens
+            include_layers: Whether to include every layer's attention matrix
+                rather than just its shape
             
         Returns:
             Dictionary with processed attention data
         """
-        num_layers = len(attention_weights)
-        num_tokens = len(tokens)
+        # Average each layer across heads once
+        layer_averages = [self._average_heads(layer_attn) for layer_attn in attention_weights]
         
         # Store layer-wise attention
-        layer_attention = []
+        layer_attention = [
+            self._layer_payload(layer_idx, avg_attention, include_layers)
+            for layer_idx, avg_attention in enumerate(layer_averages)
+        ]
         
-        for layer_idx, layer_attn in enumerate(attention_weights):
-            # Shape: (batch_size, num_heads, seq_len, seq_len)
-            # Average across heads: (seq_len, seq_len)
-            avg_attention = layer_attn[0].mean(dim=0).numpy()
+        return {
+            'layer_attention': layer_attention,
+            **self._aggregate_attention(layer_averages, tokens)
+        }
+    
+    def _layer_payload(
+        self, 
+        layer_idx: int, 
+        avg_attention: torch.Tensor, 
+        include_layers: bool
+    ) -> Dict[str, Any]:
+        """Describe one layer for the client.
+        
+        Args:
+            layer_idx: Index of the layer
+            avg_attention: Head-averaged attention matrix for the layer
+            include_layers: Whether to include the packed matrix itself
             
-            layer_attention.append({
-                'layer': layer_idx,
-                'attention_matrix': avg_attention.tolist(),
-                'shape': avg_attention.shape
-            })
-        
-        # Calculate meaningful attention (average of last 4 layers)
-        last_layers = min(4, num_layers)
-        meaningful_attention = np.zeros((num_tokens, num_tokens))
-        
-        for i in range(last_layers):
-            layer_idx = num_layers - 1 - i
-            meaningful_attention += attention_weights[layer_idx][0].mean(dim=0).numpy()
-        
-        meaningful_attention /= last_layers
-        
-        # Find strongest attention relationships
-        attention_relationships = self._extract_relationships(
-            meaningful_attention, 
-            tokens
-        )
+        Returns:
+            Layer index with either the packed matrix or only its shape
+        """
+        if include_layers:
+            return {'layer': layer_idx, **pack_matrix(avg_attention.numpy())}
+        return {'layer': layer_idx, 'shape': tuple(avg_attention.shape)}
+    
+    def _average_heads(self, layer_attn: torch.Tensor) -> torch.Tensor:
+        """Average one layer's attention across heads.
+        
+        Args:
+            layer_attn: Tensor of shape (batch_size, num_heads, seq_len, seq_len)
+            
+        Returns:
+            Contiguous float32 CPU tensor of shape (seq_len, seq_len) for the first batch item
+        """
+        # Accumulate in float32 so half/bfloat16 attentions come back full
+        # precision, and average on-device so only seq_len² values are copied back
+        return layer_attn[0].mean(dim=0, dtype=torch.float32).cpu()
+    
+    def _aggregate_attention(
+        self, 
+        layer_averages: List[torch.Tensor], 
+        tokens: List[str]
+    ) -> Dict[str, Any]:
+        """Combine head-averaged layers into meaningful attention and relationships.
+        
+        Args:
+            layer_averages: Head-averaged attention matrix for each layer
+            tokens: List of tokens
+            
+        Returns:
+            Dictionary with packed meaningful attention and relationships
+        """
+        # Calculate meaningful attention (average of last 4 layers) as one
+        # reduction over the stacked head averages, written into a pooled
+        # buffer. Heads are already averaged per layer, so this equals the
+        # mean over every head of those layers. Packing and relationship
+        # extraction both copy, so nothing outlives the buffer.
+        last_layers = min(4, len(layer_averages))
+        stacked = torch.stack(layer_averages[-last_layers:])
+        with meaningful_buffer(stacked.shape[-1]) as buffer:
+            meaningful_attention = torch.sum(stacked, dim=0, out=buffer).div_(last_layers).numpy()
+            
+            # Find strongest attention relationships
+            attention_relationships = self._extract_relationships(
+                meaningful_attention, 
+                tokens
+            )
+            packed = pack_matrix(meaningful_attention)
         
         return {
-            'layer_attention': layer_attention,
-            'meaningful_attention': meaningful_attention.tolist(),
+            'meaningful_attention': packed,
             'relationships': attention_relationships
         }
     
@@ -177,84 +712,297 @@ class AttentionExtractor:
         Returns:
             List of attention relationships
         """
-        relationships = []
+        num_tokens = len(tokens)
         
-        for i, token_from in enumerate(tokens):
-            for j, token_to in enumerate(tokens):
-                if i != j and attention_matrix[i, j] > threshold:
-                    relationships.append({
-                        'from_token': token_from,
-                        'to_token': token_to,
-                        'from_index': i,
-                        'to_index': j,
-                        'strength': float(attention_matrix[i, j])
-                    })
+        # Exclude self-attention, then pick the strongest candidates without
+        # visiting every token pair in Python
+        scores = attention_matrix.copy()
+        np.fill_diagonal(scores, -np.inf)
+        flat_scores = scores.ravel()
         
-        # Sort by strength descending
-        relationships.sort(key=lambda x: x['strength'], reverse=True)
+        top_k = min(MAX_RELATIONSHIPS, flat_scores.size)
+        candidates = np.argpartition(flat_scores, -top_k)[-top_k:]
+        candidates = np.sort(candidates[flat_scores[candidates] > threshold])
         
-        # Return top 20 relationships to avoid overwhelming visualization
-        return relationships[:20]
+        # Sort by strength descending (stable, so ties keep reading order)
+        candidates = candidates[np.argsort(-flat_scores[candidates], kind='stable')]
+        from_indices, to_indices = np.divmod(candidates, num_tokens)
+        
+        # Return at most MAX_RELATIONSHIPS to avoid overwhelming visualization
+        return [
+            {
+                'from_token': tokens[i],
+                'to_token': tokens[j],
+                'from_index': int(i),
+                'to_index': int(j),
+                'strength': float(flat_scores[index])
+            }
+            for index, i, j in zip(candidates, from_indices, to_indices)
+        ]
 
 
-def load_model() -> Tuple[DistilBertModel, DistilBertTokenizer]:
+def _example_inputs(tokenizer: PreTrainedTokenizerFast) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Build a representative input used for tracing, export and warmup.
+    
+    Args:
+        tokenizer: Loaded DistilBERT tokenizer
+        
+    Returns:
+        Tuple of input ids and attention mask tensors
+    """
+    example = tokenizer(
+        "warmup text",
+        return_tensors="pt",
+        padding="max_length",
+        max_length=TRACE_MAX_LENGTH
+    )
+    return example['input_ids'], example['attention_mask']
+
+
+def quantize_model(model: DistilBertModel) -> DistilBertModel:
+    """Dynamically quantize the model's Linear layers to int8.
+    
+    Uses fbgemm on x86 and falls back to qnnpack on ARM (e.g. Apple Silicon).
+    
+    Args:
+        model: Loaded DistilBERT model
+        
+    Returns:
+        Quantized copy of the model
+    """
+    supported_engines = torch.backends.quantized.supported_engines
+    for engine in ('fbgemm', 'qnnpack'):
+        if engine in supported_engines:
+            torch.backends.quantized.engine = engine
+            break
+    
+    return torch.ao.quantization.quantize_dynamic(
+        model, 
+        {torch.nn.Linear}, 
+        dtype=torch.qint8
+    )
+
+
+def compile_model(
+    model: DistilBertModel, 
+    tokenizer: PreTrainedTokenizerFast,
+    quantize: bool = QUANTIZE_MODEL,
+    use_ipex: bool = USE_IPEX
+) -> torch.jit.ScriptModule:
+    """Trace, freeze and optimize the model into a TorchScript attention module.
+    
+    Args:
+        model: Loaded DistilBERT model
+        tokenizer: Loaded DistilBERT tokenizer used to build the example input
+        quantize: Whether to int8-quantize Linear layers before tracing
+        use_ipex: Whether to optimize for bfloat16 with Intel Extension for
+            PyTorch and oneDNN Graph fusion (takes precedence over ``quantize``)
+        
+    Both ``quantize`` and ``use_ipex`` are CPU-only and are ignored when the
+    model lives on a GPU.
+        
+    Returns:
+        Frozen TorchScript module returning per-layer attention tensors
+    """
+    model.eval().requires_grad_(False)
+    device = next(model.parameters()).device
+    on_cpu = device.type == 'cpu'
+    autocast = contextlib.nullcontext()
+    if use_ipex and on_cpu:
+        import intel_extension_for_pytorch as ipex
+        
+        model = ipex.optimize(model, dtype=torch.bfloat16, level='O1')
+        torch.jit.enable_onednn_fusion(True)
+        autocast = torch.autocast('cpu', dtype=torch.bfloat16)
+    elif quantize and on_cpu:
+        model = quantize_model(model)
+    example_inputs = tuple(tensor.to(device) for tensor in _example_inputs(tokenizer))
+    
+    with torch.no_grad(), autocast:
+        traced = torch.jit.trace(AttentionOnlyModel(model).eval(), example_inputs, strict=False)
+        traced = torch.jit.freeze(traced, preserved_attrs=[])
+        
+        # Fold constants, drop dropout and fuse ops in the frozen graph
+        traced = torch.jit.optimize_for_inference(traced)
+        
+        # Warm up so the JIT specializes the graph before the first request
+        for _ in range(2):
+            traced(*example_inputs)
+    
+    return traced
+
+
+def export_onnx_model(
+    model: DistilBertModel, 
+    tokenizer: PreTrainedTokenizerFast,
+    path: Path = ONNX_MODEL_PATH
+) -> OnnxAttentionModel:
+    """Export the model to ONNX and open it in an ONNX Runtime session.
+    
+    Args:
+        model: Loaded DistilBERT model
+        tokenizer: Loaded DistilBERT tokenizer used to build the example input
+        path: Destination of the exported ``.onnx`` file
+        
+    Returns:
+        ONNX Runtime backed model returning per-layer attention tensors
+    """
+    import onnxruntime as ort
+    
+    model.eval()
+    example_inputs = _example_inputs(tokenizer)
+    
+    output_names = [f"attention_{i}" for i in range(model.config.num_hidden_layers)]
+    dynamic_axes = {
+        'input_ids': {0: 'batch', 1: 'seq'},
+        'attention_mask': {0: 'batch', 1: 'seq'}
+    }
+    for name in output_names:
+        dynamic_axes[name] = {0: 'batch', 2: 'seq', 3: 'seq'}
+    
+    with torch.no_grad():
+        torch.onnx.export(
+            AttentionOnlyModel(model).eval(),
+            example_inputs,
+            str(path),
+            input_names=['input_ids', 'attention_mask'],
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            dynamo=False
+        )
+    
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = os.cpu_count()
+    available_providers = ort.get_available_providers()
+    providers = [
+        provider for provider in ('CUDAExecutionProvider', 'CPUExecutionProvider')
+        if provider in available_providers
+    ]
+    session = ort.InferenceSession(
+        str(path),
+        sess_options=options,
+        providers=providers
+    )
+    return OnnxAttentionModel(session)
+
+
+def load_model() -> Tuple[
+    Union[torch.jit.ScriptModule, OnnxAttentionModel, AttentionOnlyModel], 
+    PreTrainedTokenizerFast
+]:
     """Load and cache the DistilBERT model and tokenizer.
     
     Returns:
-        Tuple of loaded model and tokenizer
+        Tuple of compiled model and tokenizer
         
     Raises:
         RuntimeError: If model loading fails
     """
     try:
         logger.info(f"Loading model: {MODEL_NAME}")
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-        model = AutoModel.from_pretrained(MODEL_NAME, output_attentions=True)
-        logger.info("Model loaded successfully")
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, use_fast=True)
+        if not tokenizer.is_fast:
+            raise ValueError("Rust-backed fast tokenizer is unavailable")
+        model = AutoModel.from_pretrained(
+            MODEL_NAME, 
+            output_attentions=True,
+            attn_implementation="eager"
+        )
+        if INFERENCE_BACKEND == "onnx":
+            model = export_onnx_model(model, tokenizer)
+        elif INFERENCE_BACKEND in ("torchscript", "eager"):
+            model = model.to(DEVICE)
+            if DEVICE.type == 'cuda':
+                model = model.half()
+            
+            if INFERENCE_BACKEND == "torchscript":
+                model = compile_model(model, tokenizer)
+            else:
+                model = AttentionOnlyModel(model).eval()
+        else:
+            raise ValueError(f"Unknown inference backend: {INFERENCE_BACKEND}")
+        logger.info(f"Model loaded successfully ({INFERENCE_BACKEND} backend on {inference_device()})")
         return model, tokenizer
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         raise RuntimeError(f"Model loading failed: {e}")
 
 
-def generate_attention_stream(text: str) -> Generator[str, None, None]:
+def inference_device() -> torch.device:
+    """Return the device model inputs should be placed on.
+    
+    ONNX Runtime takes host numpy arrays regardless of execution provider,
+    so only the PyTorch backends use the GPU device directly.
+    
+    Returns:
+        Device for model inputs
+    """
+    return torch.device("cpu") if INFERENCE_BACKEND == "onnx" else DEVICE
+
+
+def batches_requests() -> bool:
+    """Return whether concurrent requests should share a forward pass.
+    
+    Dynamic int8 quantization computes activation scales over the whole
+    padded batch, so a text's attention would depend on which requests it
+    was batched with. Quantized and eager models run one request at a time.
+    
+    Returns:
+        True if the loaded model should be wrapped in a MicroBatcher
+    """
+    if INFERENCE_BACKEND == "eager":
+        return False
+    quantized = (
+        INFERENCE_BACKEND == "torchscript"
+        and QUANTIZE_MODEL
+        and not USE_IPEX
+        and DEVICE.type == "cpu"
+    )
+    return not quantized
+
+
+def generate_attention_stream(
+    text: str, 
+    include_layers: bool = False
+) -> Generator[bytes, None, None]:
     """Generate Server-Sent Events stream for attention visualization.
     
     Args:
         text: Input text to process
+        include_layers: Whether to stream every layer's attention matrix
         
     Yields:
-        SSE-formatted strings with attention data
+        SSE-formatted bytes with attention data
     """
     try:
-        extractor = AttentionExtractor(model, tokenizer)
-        
         # Step 1: Send tokenization
-        yield f"data: {json.dumps({'type': 'tokenization', 'status': 'processing'})}\n\n"
-        
-        # Extract attention weights
-        attention_data = extractor.extract_attention_weights(text)
+        yield sse_frame({'type': 'tokenization', 'status': 'processing'})
         
-        # Step 2: Send tokens
-        yield f"data: {json.dumps({'type': 'tokens', 'data': attention_data['tokens']})}\n\n"
-        
-        # Step 3: Send layer-by-layer attention (progressive)
-        for i, layer_data in enumerate(attention_data['attention_data']['layer_attention']):
-            yield f"data: {json.dumps({'type': 'layer_attention', 'layer': i, 'data': layer_data})}\n\n"
-            # Small delay for visualization effect (simulated processing)
+        # Repeat submissions replay the stored frames without touching the model
+        cached_frames = attention_cache.get(text, include_layers)
+        if cached_frames is not None:
+            yield from cached_frames
+        else:
+            if extractor is None:
+                raise RuntimeError("Model is not loaded")
             
-        # Step 4: Send meaningful attention relationships
-        yield f"data: {json.dumps({'type': 'meaningful_attention', 'data': attention_data['attention_data']['meaningful_attention']})}\n\n"
-        
-        # Step 5: Send final relationships
-        yield f"data: {json.dumps({'type': 'relationships', 'data': attention_data['attention_data']['relationships']})}\n\n"
+            # Steps 2-5: Send tokens, then each layer as the forward pass produces
+            # it, then meaningful attention and final relationships
+            frames = []
+            for event in extractor.stream_attention_weights(text, include_layers):
+                frame = sse_frame(event)
+                frames.append(frame)
+                yield frame
+            attention_cache.put(text, frames, include_layers)
         
         # Step 6: Send completion signal
-        yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+        yield sse_frame({'type': 'complete'})
         
     except Exception as e:
         logger.error(f"Error processing attention: {e}")
-        yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        yield sse_frame({'type': 'error', 'message': str(e)})
 
 
 @app.route('/api/v1/health')
@@ -271,6 +1019,10 @@ def health_check() -> Dict[str, str]:
 def attention_endpoint() -> Response:
     """Main attention analysis endpoint.
     
+    Per-layer attention matrices are only sent when the request has the
+    ``include_layers=true`` query parameter; otherwise layers carry just
+    their index and shape.
+    
     Returns:
         Server-Sent Events stream with attention data
     """
@@ -278,19 +1030,21 @@ def attention_endpoint() -> Response:
         data = request.get_json()
         if not data or 'text' not in data:
             return Response(
-                f"data: {json.dumps({'type': 'error', 'message': 'Missing text field'})}\n\n",
+                sse_frame({'type': 'error', 'message': 'Missing text field'}),
                 mimetype='text/event-stream'
             )
         
         text = data['text'].strip()
         if not text:
             return Response(
-                f"data: {json.dumps({'type': 'error', 'message': 'Empty text provided'})}\n\n",
+                sse_frame({'type': 'error', 'message': 'Empty text provided'}),
                 mimetype='text/event-stream'
             )
         
+        include_layers = request.args.get('include_layers', 'false').lower() == 'true'
+        
         return Response(
-            generate_attention_stream(text),
+            generate_attention_stream(text, include_layers),
             mimetype='text/event-stream',
             headers={
                 'Cache-Control': 'no-cache',
@@ -302,7 +1056,7 @@ def attention_endpoint() -> Response:
     except Exception as e:
         logger.error(f"Error in attention endpoint: {e}")
         return Response(
-            f"data: {json.dumps({'type': 'error', 'message': 'Internal server error'})}\n\n",
+            sse_frame({'type': 'error', 'message': 'Internal server error'}),
             mimetype='text/event-stream'
         )
 
@@ -325,17 +1079,53 @@ def signal_handler(signum, frame):
     sys.exit(0)
 
 
+def init_app() -> Flask:
+    """Load the model and build the extractor, once per process.
+    
+    Called by main() for the development server and by the gunicorn
+    post_worker_init hook in production. Later calls return immediately.
+    
+    Returns:
+        The Flask application, ready to serve requests
+        
+    Raises:
+        RuntimeError: If model loading fails
+    """
+    global model, tokenizer, extractor
+    
+    with _init_lock:
+        if extractor is not None:
+            return app
+        
+        # Requests are served one forward pass at a time, so favor intra-op
+        # parallelism. Inter-op threads must be set before any parallel work.
+        torch.set_num_interop_threads(1)
+        torch.set_num_threads(os.cpu_count())
+        
+        # Load model on startup
+        model, tokenizer = load_model()
+        
+        # Batch concurrent requests when results don't depend on batch mates;
+        # the eager backend runs each forward pass itself so hooks can stream
+        if batches_requests():
+            model = MicroBatcher(model, pad_token_id=tokenizer.pad_token_id)
+        extractor = AttentionExtractor(model, tokenizer, device=inference_device())
+    
+    return app
+
+
 def main():
-    """Main application entry point."""
-    global model, tokenizer
+    """Development server entry point.
     
+    Production deployments should serve `app` through gunicorn.conf.py
+    instead of the Werkzeug development server.
+    """
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
     try:
-        # Load model on startup
-        model, tokenizer = load_model()
+        init_app()
         
         logger.info(f"Starting server on {HOST}:{PORT}")
         app.run(
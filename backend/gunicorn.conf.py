@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for serving the attention demo.
+
+Run from the backend directory:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Each SSE stream holds a thread for its whole lifetime, so a single worker
+process serves many concurrent streams from a thread pool and shares one
+copy of the model and its micro-batcher between them.
+"""
+
+import os
+
+bind = f"{os.environ.get('HOST', 'localhost')}:{os.environ.get('PORT', '8080')}"
+
+# One process keeps a single model in memory; threads carry the SSE streams
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+
+# Model loading and long streams can both exceed the 30 second default
+timeout = 300
+graceful_timeout = 30
+keepalive = 5
+
+# Load the model after forking so torch thread pools are created per worker
+preload_app = False
+
+
+def post_worker_init(worker):
+    """Load the model and extractor once the worker process has started."""
+    from app import init_app
+
+    init_app()
@@ -181,6 +181,7 @@ class AttentionVisualizer {
     handleSSEStream(response) {
         const reader = response.body.getReader();
         const decoder = new TextDecoder();
+        let buffer = '';
         
         const readStream = async () => {
             try {
@@ -188,8 +189,11 @@ class AttentionVisualizer {
                     const { done, value } = await reader.read();
                     if (done) break;
                     
-                    const chunk = decoder.decode(value, { stream: true });
-                    const lines = chunk.split('\n');
+                    // Packed attention matrices can span several chunks, so keep
+                    // the trailing partial line until its newline arrives
+                    buffer += decoder.decode(value, { stream: true });
+                    const lines = buffer.split('\n');
+                    buffer = lines.pop();
                     
                     for (const line of lines) {
                         if (line.startsWith('data: ')) {
@@ -233,7 +237,7 @@ class AttentionVisualizer {
                 break;
                 
             case 'meaningful_attention':
-                this.currentAttentionData = data.data;
+                this.currentAttentionData = this.unpackMatrix(data.data);
                 this.updateStatus('Generating visualization...');
                 break;
                 
@@ -257,6 +261,50 @@ class AttentionVisualizer {
         }
     }
     
+    /**
+     * Decode a base64 float16 attention matrix into an array of rows
+     */
+    unpackMatrix(packed) {
+        const binary = atob(packed.attention_matrix);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        
+        const [rows, cols] = packed.shape;
+        const values = typeof Float16Array !== 'undefined'
+            ? new Float16Array(bytes.buffer)
+            : this.decodeFloat16(new Uint16Array(bytes.buffer));
+        
+        const matrix = [];
+        for (let row = 0; row < rows; row++) {
+            matrix.push(Array.from(values.subarray(row * cols, (row + 1) * cols)));
+        }
+        return matrix;
+    }
+    
+    /**
+     * Convert raw IEEE 754 half-precision bits to Float32 (for browsers without Float16Array)
+     */
+    decodeFloat16(halves) {
+        const floats = new Float32Array(halves.length);
+        for (let i = 0; i < halves.length; i++) {
+            const h = halves[i];
+            const sign = h & 0x8000 ? -1 : 1;
+            const exponent = (h >> 10) & 0x1f;
+            const fraction = h & 0x3ff;
+            
+            if (exponent === 0) {
+                floats[i] = sign * Math.pow(2, -14) * (fraction / 1024);
+            } else if (exponent === 0x1f) {
+                floats[i] = fraction ? NaN : sign * Infinity;
+            } else {
+                floats[i] = sign * Math.pow(2, exponent - 15) * (1 + fraction / 1024);
+            }
+        }
+        return floats;
+    }
+    
     /**
      * Display tokens in the UI (filtered to show only meaningful words)
      */
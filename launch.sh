@@ -203,7 +203,13 @@ launch_app() {
     cd "$BACKEND_DIR"
     
     # Launch the app
-    if python app.py; then
+    if [ "$PRODUCTION" = true ]; then
+        LAUNCH_CMD="gunicorn -c gunicorn.conf.py app:app"
+    else
+        LAUNCH_CMD="python app.py"
+    fi
+    
+    if $LAUNCH_CMD; then
         log_success "Application stopped normally"
     else
         log_error "Application exited with an error"
@@ -230,6 +236,7 @@ main() {
     # Parse command line arguments
     SKIP_MODEL_DOWNLOAD=false
     FORCE_REINSTALL=false
+    PRODUCTION=false
     
     while [[ $# -gt 0 ]]; do
         case $1 in
@@ -241,12 +248,17 @@ main() {
                 FORCE_REINSTALL=true
                 shift
                 ;;
+            --production)
+                PRODUCTION=true
+                shift
+                ;;
             --help|-h)
                 echo "Usage: $0 [OPTIONS]"
                 echo ""
                 echo "Options:"
                 echo "  --skip-models      Skip pre-downloading AI models"
                 echo "  --force-reinstall  Force reinstall all dependencies"
+                echo "  --production       Serve with gunicorn instead of the dev server"
                 echo "  --help, -h         Show this help message"
                 echo ""
                 echo "This script will:"
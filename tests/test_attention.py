@@ -8,7 +8,9 @@ Author: AI Assistant
 Date: August 2025
 """
 
+import base64
 import json
+import threading
 import pytest
 from unittest.mock import Mock, patch
 import numpy as np
@@ -19,7 +21,31 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from app import AttentionExtractor, app, load_model
+from transformers import DistilBertConfig, DistilBertModel
+
+from app import (
+    DEMO_MAX_TOKENS,
+    DEVICE,
+    AttentionExtractor,
+    AttentionCache,
+    AttentionOnlyModel,
+    MicroBatcher,
+    app,
+    attention_cache,
+    compile_model,
+    batches_requests,
+    export_onnx_model,
+    init_app,
+    load_model,
+    meaningful_buffer,
+    pack_matrix,
+)
+
+
+def unpack_matrix(packed):
+    """Decode a matrix encoded by pack_matrix."""
+    data = np.frombuffer(base64.b64decode(packed['attention_matrix']), dtype='<f2')
+    return data.reshape(packed['shape'])
 
 
 class TestAttentionExtractor:
@@ -40,9 +66,7 @@ class TestAttentionExtractor:
         
         # Configure mock model outputs
         mock_attention = torch.rand(1, 8, 4, 4)  # (batch, heads, seq_len, seq_len)
-        mock_outputs = Mock()
-        mock_outputs.attentions = (mock_attention, mock_attention, mock_attention)
-        self.mock_model.return_value = mock_outputs
+        self.mock_model.return_value = (mock_attention, mock_attention, mock_attention)
         
         self.extractor = AttentionExtractor(self.mock_model, self.mock_tokenizer)
     
@@ -60,6 +84,29 @@ class TestAttentionExtractor:
         assert result['num_layers'] == 3
         assert result['num_heads'] == 8
     
+    def test_extract_attention_weights_truncates_without_padding(self):
+        """Test that input is truncated to DEMO_MAX_TOKENS and not padded."""
+        self.extractor.extract_attention_weights("hello world")
+        
+        _, kwargs = self.mock_tokenizer.call_args
+        assert kwargs['truncation'] is True
+        assert kwargs['max_length'] == DEMO_MAX_TOKENS
+        assert 'padding' not in kwargs
+    
+    @pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA not available")
+    def test_extract_attention_weights_cuda_inputs(self):
+        """Test that inputs are moved to the GPU and attentions come back on the CPU."""
+        mock_attention = torch.rand(1, 8, 4, 4, device='cuda')
+        self.mock_model.return_value = (mock_attention,)
+        extractor = AttentionExtractor(self.mock_model, self.mock_tokenizer, device=torch.device('cuda'))
+        
+        result = extractor.extract_attention_weights("hello world")
+        
+        input_ids, attention_mask = self.mock_model.call_args[0]
+        assert input_ids.device.type == 'cuda'
+        assert attention_mask.device.type == 'cuda'
+        assert result['attention_data']['meaningful_attention']['shape'] == (4, 4)
+    
     def test_extract_attention_weights_empty_input(self):
         """Test attention extraction with empty input."""
         with pytest.raises(ValueError, match="Text cannot be empty"):
@@ -71,6 +118,44 @@ class TestAttentionExtractor:
         with pytest.raises(ValueError, match="Text exceeds maximum length"):
             self.extractor.extract_attention_weights(long_text)
     
+    def test_stream_attention_weights_event_order(self):
+        """Test that streamed events arrive as tokens, layers, meaningful attention, relationships."""
+        events = list(self.extractor.stream_attention_weights("hello world"))
+        
+        assert [event['type'] for event in events] == [
+            'tokens',
+            'layer_attention', 'layer_attention', 'layer_attention',
+            'meaningful_attention',
+            'relationships'
+        ]
+        assert events[0]['data'] == ['[CLS]', 'hello', 'world', '[SEP]']
+        assert [event['layer'] for event in events[1:4]] == [0, 1, 2]
+    
+    def test_stream_attention_weights_eager_hooks(self, tiny_distilbert):
+        """Test that an eager model streams the same layers as the batch extraction."""
+        eager_model = tiny_distilbert
+        extractor = AttentionExtractor(AttentionOnlyModel(eager_model), self.mock_tokenizer)
+        
+        expected = extractor.extract_attention_weights("hello world", include_layers=True)['attention_data']
+        hook_counts = [len(layer.attention._forward_hooks) for layer in eager_model.transformer.layer]
+        
+        events = list(extractor.stream_attention_weights("hello world", include_layers=True))
+        
+        layer_events = [event['data'] for event in events if event['type'] == 'layer_attention']
+        assert layer_events == expected['layer_attention']
+        assert events[-2]['data'] == expected['meaningful_attention']
+        # Streaming hooks are removed once the forward pass completes
+        assert [len(layer.attention._forward_hooks) for layer in eager_model.transformer.layer] == hook_counts
+    
+    def test_stream_attention_weights_model_error(self):
+        """Test that errors in the forward pass are raised from the stream."""
+        self.mock_model.side_effect = RuntimeError("forward failed")
+        
+        stream = self.extractor.stream_attention_weights("hello world")
+        assert next(stream)['type'] == 'tokens'
+        with pytest.raises(RuntimeError, match="forward failed"):
+            next(stream)
+    
     def test_process_attention_weights(self):
         """Test attention weight processing."""
         # Create mock attention weights
@@ -88,8 +173,91 @@ class TestAttentionExtractor:
         assert 'relationships' in result
         
         assert len(result['layer_attention']) == 3
-        assert len(result['meaningful_attention']) == 4
-        assert len(result['meaningful_attention'][0]) == 4
+        assert result['meaningful_attention']['shape'] == (4, 4)
+        assert unpack_matrix(result['meaningful_attention']).shape == (4, 4)
+        # Per-layer matrices are opt-in; by default only metadata is sent
+        assert result['layer_attention'][0] == {'layer': 0, 'shape': (4, 4)}
+    
+    def test_process_attention_weights_include_layers(self):
+        """Test that per-layer matrices are packed when requested."""
+        attention_weights = tuple(torch.rand(1, 8, 4, 4) for _ in range(3))
+        tokens = ['[CLS]', 'hello', 'world', '[SEP]']
+        
+        result = self.extractor._process_attention_weights(attention_weights, tokens, include_layers=True)
+        
+        for layer_idx, layer_data in enumerate(result['layer_attention']):
+            assert layer_data['layer'] == layer_idx
+            expected = attention_weights[layer_idx][0].mean(dim=0).numpy()
+            assert np.allclose(unpack_matrix(layer_data), expected, atol=1e-3)
+    
+    def test_process_attention_weights_meaningful_average(self):
+        """Test that meaningful attention averages the last four layers across heads."""
+        attention_weights = tuple(torch.rand(1, 8, 4, 4) for _ in range(6))
+        tokens = ['[CLS]', 'hello', 'world', '[SEP]']
+        
+        result = self.extractor._process_attention_weights(attention_weights, tokens)
+        
+        expected = torch.stack([attn[0] for attn in attention_weights[-4:]]).mean(dim=(0, 1))
+        assert np.allclose(unpack_matrix(result['meaningful_attention']), expected.numpy(), atol=1e-3)
+    
+    def test_process_attention_weights_reuses_buffer(self):
+        """Test that consecutive requests on one thread do not corrupt earlier results."""
+        tokens = ['[CLS]', 'hello', 'world', '[SEP]']
+        first_weights = tuple(torch.rand(1, 8, 4, 4) for _ in range(3))
+        second_weights = tuple(torch.rand(1, 8, 4, 4) for _ in range(3))
+        
+        first = self.extractor._process_attention_weights(first_weights, tokens)
+        self.extractor._process_attention_weights(second_weights, tokens)
+        
+        expected = torch.stack([attn[0] for attn in first_weights]).mean(dim=(0, 1))
+        assert np.allclose(unpack_matrix(first['meaningful_attention']), expected.numpy(), atol=1e-3)
+    
+    def test_meaningful_buffer_reused_across_threads(self):
+        """Test that pooled buffers are sized to the sequence and reused by other threads."""
+        with meaningful_buffer(4) as small:
+            assert small.dtype == torch.float32
+            assert small.shape == (4, 4)
+            small_ptr = small.data_ptr()
+        
+        # A returned buffer is handed to the next request, even on a new thread
+        borrowed = {}
+        
+        def borrow():
+            with meaningful_buffer(3) as buffer:
+                borrowed['ptr'] = buffer.data_ptr()
+        
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        thread.join()
+        assert borrowed['ptr'] == small_ptr
+        
+        with meaningful_buffer(600) as large:
+            assert large.shape == (600, 600)
+    
+    def test_meaningful_buffer_concurrent_borrowers_get_distinct_storage(self):
+        """Test that buffers borrowed at the same time never alias."""
+        with meaningful_buffer(4) as first, meaningful_buffer(4) as second:
+            assert first.data_ptr() != second.data_ptr()
+    
+    def test_pack_matrix_round_trip(self):
+        """Test that packed float16 matrices decode to the original values."""
+        matrix = np.random.rand(5, 5).astype(np.float32)
+        
+        packed = pack_matrix(matrix)
+        
+        assert isinstance(packed['attention_matrix'], str)
+        assert packed['shape'] == (5, 5)
+        assert np.allclose(unpack_matrix(packed), matrix, atol=1e-3)
+    
+    def test_process_attention_weights_bfloat16(self):
+        """Test that bfloat16 attentions (IPEX autocast) are averaged in float32."""
+        attention_weights = tuple(torch.rand(1, 8, 4, 4).to(torch.bfloat16) for _ in range(3))
+        tokens = ['[CLS]', 'hello', 'world', '[SEP]']
+        
+        result = self.extractor._process_attention_weights(attention_weights, tokens)
+        
+        expected = torch.stack([attn[0].float() for attn in attention_weights]).mean(dim=(0, 1))
+        assert np.allclose(unpack_matrix(result['meaningful_attention']), expected.numpy(), atol=1e-3)
     
     def test_extract_relationships(self):
         """Test relationship extraction."""
@@ -119,6 +287,30 @@ class TestAttentionExtractor:
             assert 'to_index' in rel
             assert 'strength' in rel
 
+    
+    def test_extract_relationships_matches_pairwise_scan(self):
+        """Test relationship extraction against an exhaustive pairwise scan."""
+        rng = np.random.default_rng(0)
+        attention_matrix = rng.random((30, 30))
+        tokens = [f'token{i}' for i in range(30)]
+        
+        expected = sorted(
+            (
+                (attention_matrix[i, j], i, j)
+                for i in range(30)
+                for j in range(30)
+                if i != j and attention_matrix[i, j] > 0.1
+            ),
+            reverse=True
+        )[:20]
+        
+        relationships = self.extractor._extract_relationships(attention_matrix, tokens)
+        
+        assert [(rel['from_index'], rel['to_index']) for rel in relationships] == [
+            (i, j) for _, i, j in expected
+        ]
+        assert all(rel['from_index'] != rel['to_index'] for rel in relationships)
+        assert relationships[0]['from_token'] == tokens[expected[0][1]]
 
 class TestAPI:
     """Test cases for Flask API endpoints."""
@@ -127,6 +319,7 @@ class TestAPI:
         """Set up test client."""
         app.config['TESTING'] = True
         self.client = app.test_client()
+        attention_cache.clear()
     
     def test_health_endpoint(self):
         """Test health check endpoint."""
@@ -138,11 +331,11 @@ class TestAPI:
         assert 'model' in data
         assert data['status'] == 'healthy'
     
-    @patch('app.model')
-    @patch('app.tokenizer')
-    def test_attention_endpoint_valid_input(self, mock_tokenizer, mock_model):
+    def test_attention_endpoint_valid_input(self):
         """Test attention endpoint with valid input."""
         # Configure mocks
+        mock_model = Mock()
+        mock_tokenizer = Mock()
         mock_tokenizer.convert_ids_to_tokens.return_value = ['hello', 'world']
         mock_tokenizer.return_value = {
             'input_ids': torch.tensor([[101, 7592, 2088, 102]]),
@@ -150,18 +343,66 @@ class TestAPI:
         }
         
         mock_attention = torch.rand(1, 8, 4, 4)
-        mock_outputs = Mock()
-        mock_outputs.attentions = (mock_attention,)
-        mock_model.return_value = mock_outputs
+        mock_model.return_value = (mock_attention,)
         mock_model.eval.return_value = None
         
-        response = self.client.post('/api/v1/attention', 
-                                  json={'text': 'hello world'},
-                                  headers={'Content-Type': 'application/json'})
+        with patch('app.extractor', AttentionExtractor(mock_model, mock_tokenizer)):
+            response = self.client.post('/api/v1/attention', 
+                                      json={'text': 'hello world'},
+                                      headers={'Content-Type': 'application/json'})
         
         assert response.status_code == 200
         assert response.content_type == 'text/event-stream; charset=utf-8'
     
+    def test_attention_endpoint_cached_repeat(self):
+        """Test that repeating the same text replays cached frames without running the model."""
+        mock_model = Mock()
+        mock_tokenizer = Mock()
+        mock_tokenizer.convert_ids_to_tokens.return_value = ['hello', 'world']
+        mock_tokenizer.return_value = {
+            'input_ids': torch.tensor([[7592, 2088]]),
+            'attention_mask': torch.tensor([[1, 1]])
+        }
+        mock_model.return_value = (torch.rand(1, 8, 2, 2),)
+        
+        with patch('app.extractor', AttentionExtractor(mock_model, mock_tokenizer)):
+            first = self.client.post('/api/v1/attention', json={'text': 'hello world'}).data
+            second = self.client.post('/api/v1/attention', json={'text': 'hello world'}).data
+        
+        assert first == second
+        assert b'"type":"complete"' in second
+        assert mock_model.call_count == 1
+    
+    def test_attention_endpoint_include_layers(self):
+        """Test that per-layer matrices are only streamed when requested."""
+        mock_model = Mock()
+        mock_tokenizer = Mock()
+        mock_tokenizer.convert_ids_to_tokens.return_value = ['hello', 'world']
+        mock_tokenizer.return_value = {
+            'input_ids': torch.tensor([[7592, 2088]]),
+            'attention_mask': torch.tensor([[1, 1]])
+        }
+        mock_model.return_value = (torch.rand(1, 8, 2, 2), torch.rand(1, 8, 2, 2))
+        
+        with patch('app.extractor', AttentionExtractor(mock_model, mock_tokenizer)):
+            default = self.client.post('/api/v1/attention', json={'text': 'hello world'}).data
+            with_layers = self.client.post(
+                '/api/v1/attention?include_layers=true', 
+                json={'text': 'hello world'}
+            ).data
+        
+        # Meaningful attention is always packed; layer matrices only on request
+        assert default.count(b'"attention_matrix"') == 1
+        assert with_layers.count(b'"attention_matrix"') == 3
+        assert mock_model.call_count == 2
+    
+    def test_attention_endpoint_model_not_loaded(self):
+        """Test attention endpoint before the model has been loaded."""
+        with patch('app.extractor', None):
+            response = self.client.post('/api/v1/attention', json={'text': 'hello world'})
+        
+        assert b'Model is not loaded' in response.data
+    
     def test_attention_endpoint_missing_text(self):
         """Test attention endpoint with missing text field."""
         response = self.client.post('/api/v1/attention', 
@@ -183,15 +424,128 @@ class TestAPI:
         assert 'Empty text provided' in data
 
 
+class TestAttentionCache:
+    """Test cases for the attention result cache."""
+    
+    def test_get_miss_returns_none(self):
+        """Test that unknown texts are cache misses."""
+        cache = AttentionCache(maxsize=2)
+        assert cache.get("hello") is None
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used text is evicted when full."""
+        cache = AttentionCache(maxsize=2)
+        cache.put("a", ["frame a"])
+        cache.put("b", ["frame b"])
+        cache.get("a")
+        cache.put("c", ["frame c"])
+        
+        assert cache.get("a") == ["frame a"]
+        assert cache.get("b") is None
+        assert cache.get("c") == ["frame c"]
+    
+    def test_include_layers_is_part_of_key(self):
+        """Test that responses with and without layer matrices are cached separately."""
+        cache = AttentionCache(maxsize=2)
+        cache.put("a", ["layers"], include_layers=True)
+        
+        assert cache.get("a") is None
+        assert cache.get("a", include_layers=True) == ["layers"]
+
+
+class TestMicroBatcher:
+    """Test cases for batching concurrent forward passes."""
+    
+    @staticmethod
+    def fake_model(batch_sizes):
+        """Model whose attention rows echo each sequence's token ids."""
+        def model(input_ids, attention_mask):
+            batch_sizes.append(input_ids.shape[0])
+            seq_len = input_ids.shape[1]
+            attention = input_ids[:, None, :, None].float().expand(-1, 2, -1, seq_len)
+            return (attention, attention * 2)
+        return model
+    
+    def test_single_request(self):
+        """Test that a lone request gets its own unpadded attentions."""
+        batch_sizes = []
+        batcher = MicroBatcher(self.fake_model(batch_sizes), max_wait=0.001)
+        input_ids = torch.tensor([[101, 7592, 102]])
+        
+        result = batcher(input_ids, torch.ones_like(input_ids))
+        
+        assert len(result) == 2
+        assert result[0].shape == (1, 2, 3, 3)
+        assert torch.equal(result[0][0, 0, :, 0], input_ids[0].float())
+        assert batch_sizes == [1]
+    
+    def test_concurrent_requests_share_forward_pass(self):
+        """Test that concurrent requests are padded into one batch and sliced back."""
+        batch_sizes = []
+        batcher = MicroBatcher(self.fake_model(batch_sizes), max_wait=0.5)
+        inputs = [torch.randint(1000, 2000, (1, length)) for length in (3, 7, 5)]
+        results = {}
+        start = threading.Barrier(len(inputs))
+        
+        def submit(index):
+            start.wait()
+            results[index] = batcher(inputs[index], torch.ones_like(inputs[index]))
+        
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(inputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert batch_sizes == [3]
+        for index, input_ids in enumerate(inputs):
+            length = input_ids.shape[1]
+            assert results[index][1].shape == (1, 2, length, length)
+            assert torch.equal(results[index][0][0, 0, :, 0], input_ids[0].float())
+    
+    def test_model_error_propagates(self):
+        """Test that a failing forward pass raises in the waiting caller."""
+        def failing_model(input_ids, attention_mask):
+            raise RuntimeError("forward failed")
+        
+        batcher = MicroBatcher(failing_model, max_wait=0.001)
+        input_ids = torch.tensor([[101, 102]])
+        
+        with pytest.raises(RuntimeError, match="forward failed"):
+            batcher(input_ids, torch.ones_like(input_ids))
+    
+    def test_malformed_output_fails_caller_and_keeps_batching(self):
+        """Test that an error outside the forward pass reaches the caller and later batches still run."""
+        batch_sizes = []
+        fake_model = self.fake_model(batch_sizes)
+        
+        def flaky_model(input_ids, attention_mask):
+            # The first forward pass returns something that cannot be sliced
+            attention = fake_model(input_ids, attention_mask)
+            return None if len(batch_sizes) == 1 else attention
+        
+        batcher = MicroBatcher(flaky_model, max_wait=0.001)
+        input_ids = torch.tensor([[101, 102]])
+        
+        with pytest.raises(TypeError):
+            batcher(input_ids, torch.ones_like(input_ids))
+        
+        result = batcher(input_ids, torch.ones_like(input_ids))
+        assert result[0].shape == (1, 2, 2, 2)
+        assert batch_sizes == [1, 1]
+
+
 class TestModelLoading:
     """Test cases for model loading functionality."""
     
+    @patch('app.compile_model')
     @patch('app.AutoTokenizer.from_pretrained')
     @patch('app.AutoModel.from_pretrained')
-    def test_load_model_success(self, mock_model, mock_tokenizer):
+    def test_load_model_success(self, mock_model, mock_tokenizer, mock_compile):
         """Test successful model loading."""
         mock_tokenizer.return_value = Mock()
         mock_model.return_value = Mock()
+        mock_compile.return_value = Mock()
         
         model, tokenizer = load_model()
         
@@ -199,6 +553,87 @@ class TestModelLoading:
         assert tokenizer is not None
         mock_tokenizer.assert_called_once()
         mock_model.assert_called_once()
+        mock_model.return_value.to.assert_called_once_with(DEVICE)
+        mock_compile.assert_called_once()
+        assert mock_compile.call_args[0][1] is mock_tokenizer.return_value
+    
+    @patch('app.AutoTokenizer.from_pretrained')
+    @patch('app.AutoModel.from_pretrained')
+    def test_load_model_requires_fast_tokenizer(self, mock_model, mock_tokenizer):
+        """Test that model loading fails without the fast tokenizer."""
+        mock_tokenizer.return_value = Mock(is_fast=False)
+        
+        with pytest.raises(RuntimeError, match="fast tokenizer"):
+            load_model()
+        mock_tokenizer.assert_called_once_with("distilbert-base-uncased", use_fast=True)
+    
+    @pytest.mark.parametrize('backend, quantize, expected', [
+        ('torchscript', True, DEVICE.type != 'cpu'),
+        ('torchscript', False, True),
+        ('onnx', True, True),
+        ('eager', False, False),
+    ])
+    def test_batches_requests(self, backend, quantize, expected):
+        """Test that batching is skipped for eager and int8-quantized models."""
+        with patch('app.INFERENCE_BACKEND', backend), patch('app.QUANTIZE_MODEL', quantize), \
+                patch('app.USE_IPEX', False):
+            assert batches_requests() is expected
+    
+    @patch('app.torch.set_num_interop_threads')
+    @patch('app.load_model')
+    def test_init_app_loads_model_once(self, mock_load, mock_interop):
+        """Test that init_app builds the extractor once and is a no-op afterwards."""
+        mock_load.return_value = (Mock(), Mock())
+        
+        with patch('app.extractor', None), patch('app.model', None), \
+                patch('app.tokenizer', None), patch('app.INFERENCE_BACKEND', 'eager'):
+            import app as app_module
+            
+            assert init_app() is app
+            first = app_module.extractor
+            assert init_app() is app
+            
+            assert isinstance(first, AttentionExtractor)
+            assert app_module.extractor is first
+            mock_load.assert_called_once()
+    
+    @pytest.mark.parametrize('quantize, atol', [
+        (False, 1e-6),
+        (True, 0.05),
+    ])
+    def test_compile_model_matches_eager(self, tiny_distilbert, example_tokenizer, quantize, atol):
+        """Test that the traced model, int8-quantized or not, returns eager DistilBERT's attentions."""
+        traced = compile_model(tiny_distilbert, example_tokenizer, quantize=quantize)
+        
+        input_ids = torch.randint(1000, 2000, (1, 7))
+        attention_mask = torch.ones(1, 7, dtype=torch.long)
+        with torch.no_grad():
+            expected = tiny_distilbert(input_ids, attention_mask, output_attentions=True).attentions
+            actual = traced(input_ids, attention_mask)
+        
+        assert len(actual) == tiny_distilbert.config.n_layers
+        assert actual[0].shape == (1, 2, 7, 7)
+        for expected_layer, actual_layer in zip(expected, actual):
+            # Softmax rows still sum to one, and quantization stays close to fp32
+            assert torch.allclose(actual_layer.sum(dim=-1), torch.ones(1, 2, 7), atol=1e-5)
+            assert torch.allclose(expected_layer, actual_layer, atol=atol)
+    
+    def test_export_onnx_model_matches_eager(self, tmp_path, tiny_distilbert, example_tokenizer):
+        """Test that the ONNX Runtime model returns the same attentions as eager DistilBERT."""
+        pytest.importorskip('onnxruntime')
+        
+        onnx_model = export_onnx_model(tiny_distilbert, example_tokenizer, tmp_path / 'model.onnx')
+        
+        input_ids = torch.randint(1000, 2000, (1, 7))
+        attention_mask = torch.ones(1, 7, dtype=torch.long)
+        with torch.no_grad():
+            expected = tiny_distilbert(input_ids, attention_mask, output_attentions=True).attentions
+        actual = onnx_model(input_ids, attention_mask)
+        
+        assert len(actual) == tiny_distilbert.config.n_layers
+        assert actual[0].shape == (1, 2, 7, 7)
+        for expected_layer, actual_layer in zip(expected, actual):
+            assert torch.allclose(expected_layer, actual_layer, atol=1e-5)
     
     @patch('app.AutoTokenizer.from_pretrained')
     @patch('app.AutoModel.from_pretrained')
@@ -230,5 +665,25 @@ def sample_attention_matrix():
     return np.random.rand(size, size)
 
 
+@pytest.fixture
+def tiny_distilbert():
+    """Small randomly initialized DistilBERT with eager attention."""
+    config = DistilBertConfig(n_layers=3, n_heads=2, dim=32, hidden_dim=64)
+    model = DistilBertModel(config)
+    model.set_attn_implementation('eager')
+    return model.eval()
+
+
+@pytest.fixture
+def example_tokenizer():
+    """Tokenizer stub returning a fixed 16-token example for tracing and export."""
+    tokenizer = Mock()
+    tokenizer.return_value = {
+        'input_ids': torch.randint(1000, 2000, (1, 16)),
+        'attention_mask': torch.ones(1, 16, dtype=torch.long)
+    }
+    return tokenizer
+
+
 if __name__ == '__main__':
     pytest.main([__file__])